@@ -3,7 +3,12 @@ Template Component main class.
 
 """
 import csv
+import io
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+from operator import itemgetter
 from typing import List, Dict
 
 from keboola.component.base import ComponentBase, sync_action
@@ -16,6 +21,13 @@ import keboolaApi.client as client
 KEY_OUTPUT_LIST_FLOWS = 'output_list_flows'
 KEY_FLOW_TRIGGER_IDS = 'flow_trigger_ids'
 
+# number of parallel requests used when fetching trigger details; the GIL is
+# released during socket I/O, so threads scale with concurrency up to the
+# connection pool size of the client session
+MAX_WORKERS = 32
+# buffer size for the output CSV, keeps syscalls per run low
+WRITE_BUFFER_SIZE = 1024 * 1024
+
 
 class Component(ComponentBase):
     """
@@ -31,6 +43,10 @@ class Component(ComponentBase):
     def __init__(self):
         super().__init__()
         self.client = None
+        self._triggers_memo = {}
+        # one pool shared by the detail fan-out and the trigger reset path,
+        # so threads and their keep-alive connections are reused across both
+        self._executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 
     def run(self):
         """
@@ -40,23 +56,22 @@ class Component(ComponentBase):
         params = self.configuration.parameters
 
         # reset triggers
-        if params.get(KEY_FLOW_TRIGGER_IDS) or len(params.get(KEY_FLOW_TRIGGER_IDS)) > 0:
-            triggers = self._list_triggers(params.get(KEY_FLOW_TRIGGER_IDS))
-            for trigger in triggers:
-                # Remove triggers
-                if trigger:
-                    logging.info(
-                        f"Reset trigger id:{trigger.get('id')} "
-                        f"for flow name:{trigger.get('configuration_detail').get('name')}")
-                    new_trigger_conf = self._prep_new_trigger_configuration(trigger)
-                    self.client.create_trigger(new_trigger_conf)
-                    self.client.remove_trigger(trigger.get('id'))
+        trigger_ids = params.get(KEY_FLOW_TRIGGER_IDS) or []
+        if trigger_ids:
+            triggers = self._list_triggers(trigger_ids)
+            # Reset triggers - independent across triggers, so run them in parallel;
+            # each task still creates the replacement before removing the old trigger
+            reset_futures = [self._executor.submit(self._reset_trigger, trigger)
+                             for trigger in triggers if trigger]
+            for future in as_completed(reset_futures):
+                future.result()
 
         # List triggers to output
         if params.get(KEY_OUTPUT_LIST_FLOWS):
-            # List triggers
-            triggers = self._list_triggers()
-            if triggers:
+            # List triggers - stream rows to the CSV as triggers are enriched
+            triggers = self._iter_triggers()
+            first_trigger = next(triggers, None)
+            if first_trigger:
                 columns = ['flow_configuration_id',
                            'trigger_last_run',
                            'flow_configuration_name',
@@ -66,30 +81,27 @@ class Component(ComponentBase):
 
                 # Create output table (Tabledefinition - just metadata)
                 out_table = self.create_out_table_definition('flows_with_trigger.csv',
-                                                             primary_key=['flow_configuration_id', 'selected_table_id'])
+                                                             primary_key=['flow_configuration_id', 'selected_table_id'],
+                                                             incremental=True)
                 logging.info(out_table.full_path)
 
                 # Create output table (Tabledefinition - just metadata)
-                with open(out_table.full_path, mode='wt', encoding='utf-8', newline='') as out_file:
+                # write through a buffered binary stream over a raw descriptor, so
+                # encoded rows are flushed in WRITE_BUFFER_SIZE chunks
+                fd = os.open(out_table.full_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                with io.TextIOWrapper(os.fdopen(fd, 'wb', buffering=WRITE_BUFFER_SIZE),
+                                      encoding='utf-8', newline='') as out_file:
                     # write result with column added
-                    writer = csv.DictWriter(out_file, fieldnames=columns, dialect='kbc')
-                    writer.writeheader()
-
-                    for trigger in triggers:
-                        for table in trigger.get('tables'):
-                            writer.writerow({'flow_configuration_id': trigger.get('configuration_detail').get('id'),
-                                             'trigger_last_run': trigger.get('lastRun'),
-                                             'flow_configuration_name': trigger.get('configuration_detail').get('name'),
-                                             'selected_table_id': table.get('tableId'),
-                                             'selected_table_is_expected': table.get('table_detail').get('is_expected',
-                                                                                                         None),
-                                             'selected_table_last_import_date': table.get('table_detail').get(
-                                                 'lastImportDate',
-                                                 None)})
+                    writer = csv.writer(out_file, dialect='kbc')
+                    writer.writerow(columns)
+                    writer.writerows(self._generate_rows(chain([first_trigger], triggers)))
 
                 # Save table manifest (output.csv.manifest) from the tabledefinition
                 self.write_manifest(out_table)
 
+        # Persist ETags so unchanged details come back as 304 Not Modified next run
+        self.write_state_file({'etags': self.client.etag_cache})
+
     def _check_environments_variables(self):
         """
         Check the presence of required environment variables and log an error if any are missing.
@@ -103,40 +115,61 @@ class Component(ComponentBase):
     def _init_configuration(self):
         self._check_environments_variables()
         # Access parameters in data/config.json
-        self.client = client.KeboolaClient(self.environment_variables.token, self.environment_variables.url)
+        state = self.get_state_file()
+        self.client = client.KeboolaClient(self.environment_variables.token, self.environment_variables.url,
+                                           etag_cache=state.get('etags'))
+
+    def _list_triggers(self, flow_ids=None, *, fetch_tables=True):
+        """
+        Get list of triggers from the client, memoized per invocation arguments
+        """
+        memo_key = (tuple(sorted(flow_ids or [])), fetch_tables)
+        if memo_key not in self._triggers_memo:
+            self._triggers_memo[memo_key] = list(self._iter_triggers(flow_ids, fetch_tables=fetch_tables))
+        return self._triggers_memo[memo_key]
 
-    def _list_triggers(self, flow_ids=None):
+    def _iter_triggers(self, flow_ids=None, *, fetch_tables=True):
         """
-        Get list of triggers from the client
+        Yield enriched triggers as their detail fetches complete
         """
         if flow_ids:
             triggers: List[Dict] = self.client.get_trigger(flow_ids)
         else:
             triggers = self.client.get_triggers()
 
-        for trigger in triggers:
-            # Add configuration details to the trigger
-            try:
-                configuration_detail = self.client.get_component_configuration_detail(trigger.get('component'),
-                                                                                      trigger.get('configurationId'))
-                trigger['configuration_detail'] = configuration_detail
-            except client.KeboolaClientException as e:
-                logging.debug(
-                    f"Error while get_configuration_detail "
-                    f"for {trigger.get('component')}:{trigger.get('configurationId')} "
-                    f"for trigger {trigger.get('id')}: {e}")
-
-            # Add table details to the trigger
-            for table in trigger.get('tables'):
-                table_detail = self.client.get_table_detail(table.get('tableId'))
-                if table_detail:
-                    table_detail['is_expected'] = self._is_expected(trigger.get('lastRun'),
-                                                                    table_detail.get('lastImportDate'))
-                    table['table_detail'] = table_detail
-                # add some flag if some tables are missing
-                else:
-                    trigger['some_tables_missing'] = True
-        return [trigger for trigger in triggers if trigger.get('configuration_detail', None)]
+        enrich_futures = [self._executor.submit(self._enrich_trigger, trigger, fetch_tables)
+                          for trigger in triggers]
+        for future in as_completed(enrich_futures):
+            trigger = future.result()
+            if trigger.get('configuration_detail', None):
+                yield trigger
+
+    def _enrich_trigger(self, trigger, fetch_tables=True):
+        """
+        Add configuration and table details to a single trigger
+        """
+        try:
+            trigger['configuration_detail'] = self.client.get_component_configuration_detail(
+                trigger.get('component'), trigger.get('configurationId'))
+        except client.KeboolaClientException as e:
+            logging.debug(
+                f"Error while get_configuration_detail "
+                f"for {trigger.get('component')}:{trigger.get('configurationId')} "
+                f"for trigger {trigger.get('id')}: {e}")
+
+        if not fetch_tables:
+            return trigger
+
+        for table in trigger.get('tables'):
+            table_detail = self.client.get_table_detail(table.get('tableId'))
+            if table_detail:
+                table_detail['is_expected'] = self._is_expected(trigger.get('lastRun'),
+                                                                table_detail.get('lastImportDate'))
+                table['table_detail'] = table_detail
+            # add some flag if some tables are missing
+            else:
+                trigger['some_tables_missing'] = True
+        return trigger
 
     @sync_action('list_flows')
     def list_flows(self):
@@ -145,7 +178,8 @@ class Component(ComponentBase):
         """
         self._init_configuration()
         return [SelectElement(label=trigger.get('configuration_detail').get('name'),
-                              value=trigger.get('configuration_detail').get('id')) for trigger in self._list_triggers()]
+                              value=trigger.get('configuration_detail').get('id'))
+                for trigger in self._list_triggers(fetch_tables=False)]
 
     @sync_action('flow_detail')
     def flow_detail(self):
@@ -156,11 +190,10 @@ class Component(ComponentBase):
         params = self.configuration.parameters
         # Get detail of triggers
         if params.get(KEY_FLOW_TRIGGER_IDS):
-            # Initialize the Markdown table
-            markdown_table = "| Flow | Trigger Last Run | Selected Tables | Last Import | Is expected |\n"
-            markdown_table += "|------|------------------|-----------------|-------------|-------------|\n"
-            # Fill in the table rows
-            markdown_table += ''.join(
+            # Initialize the Markdown table header and fill in the rows
+            parts = ["| Flow | Trigger Last Run | Selected Tables | Last Import | Is expected |\n",
+                     "|------|------------------|-----------------|-------------|-------------|\n"]
+            parts.extend(
                 f"| **{trigger['configuration_detail']['name']}** "
                 f"| {trigger['lastRun']} "
                 f"| **{table['table_detail']['id']}** "
@@ -171,7 +204,39 @@ class Component(ComponentBase):
             )
 
             # Return the Markdown table
-            return ValidationResult(message=markdown_table)
+            return ValidationResult(message=''.join(parts))
+
+    @staticmethod
+    def _generate_rows(triggers):
+        """
+        Yield one output row per selected table of each trigger
+        """
+        # itemgetter extracts all keys in one C-level call per dict
+        configuration_fields = itemgetter('id', 'name')
+        table_detail_fields = itemgetter('is_expected', 'lastImportDate')
+        for trigger in triggers:
+            # hoist the per-trigger values out of the inner loop
+            configuration_id, configuration_name = configuration_fields(trigger['configuration_detail'])
+            last_run = trigger['lastRun']
+            for table in trigger.get('tables'):
+                is_expected, last_import_date = table_detail_fields(table['table_detail'])
+                yield (configuration_id,
+                       last_run,
+                       configuration_name,
+                       table['tableId'],
+                       is_expected,
+                       last_import_date)
+
+    def _reset_trigger(self, trigger):
+        """
+        Replace a trigger with a fresh copy of its configuration
+        """
+        logging.info(
+            f"Reset trigger id:{trigger.get('id')} "
+            f"for flow name:{trigger.get('configuration_detail').get('name')}")
+        new_trigger_conf = self._prep_new_trigger_configuration(trigger)
+        self.client.create_trigger(new_trigger_conf)
+        self.client.remove_trigger(trigger.get('id'))
 
     @staticmethod
     def _prep_new_trigger_configuration(trigger):
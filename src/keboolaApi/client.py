@@ -1,68 +1,132 @@
-import json
 import logging
+import threading
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter, Retry
 
 
 class KeboolaClientException(Exception):
     pass
 
 
+def _handle_http_error(response):
+    # fast path - nothing to parse for 2xx responses
+    if 200 <= response.status_code < 300:
+        return
+    try:
+        response.raise_for_status()
+    except requests.HTTPError as e:
+        response_error = orjson.loads(e.response.content)
+        raise KeboolaClientException(
+            f"{response_error.get('error')}. Exception code {response_error.get('code')}") from e
+
+
 class KeboolaClient:
-    def __init__(self, token, url):
+    def __init__(self, token, url, etag_cache=None):
         self.token = token
         self.url = f'{url}/v2/storage'
         self.headers = {
             'X-StorageApi-Token': self.token,
             'Content-Type': 'application/json'
         }
-
-    @staticmethod
-    def _handle_http_error(response):
-        try:
-            response.raise_for_status()
-        except requests.HTTPError as e:
-            response_error = json.loads(e.response.text)
-            raise KeboolaClientException(
-                f"{response_error.get('error')}. Exception code {response_error.get('code')}") from e
+        # reuse keep-alive connections instead of a new TCP+TLS handshake per request;
+        # pool_maxsize must stay above the worker count of the component's thread pool
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=32, pool_maxsize=64,
+            max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])))
+        self.session.headers.update(self.headers)
+        # cache detail responses for the lifetime of the run - the same configuration
+        # and table are commonly referenced by several triggers
+        self._cfg_cache = {}
+        self._tbl_cache = {}
+        self._triggers_cache = None
+        # {url: [etag, body]} persisted across runs via the component state file;
+        # lets the API answer 304 Not Modified for unchanged details
+        self.etag_cache = dict(etag_cache or {})
+        self._cache_lock = threading.Lock()
 
     def get_trigger(self, flow_ids):
         # return all triggers that are in the flow_ids list
+        flow_ids = set(flow_ids)
         return [trigger for trigger in self.get_triggers() if trigger.get('configurationId') in flow_ids]
 
     def get_triggers(self):
-        url = f'{self.url}/triggers'
-        response = requests.get(url=url, headers=self.headers)
+        with self._cache_lock:
+            if self._triggers_cache is not None:
+                return self._triggers_cache
 
-        self._handle_http_error(response)
-        return response.json()
+        url = f'{self.url}/triggers'
+        response = self.session.get(url=url)
+
+        _handle_http_error(response)
+        triggers = orjson.loads(response.content)
+        with self._cache_lock:
+            self._triggers_cache = triggers
+        return triggers
+
+    def _get_with_etag(self, url):
+        # conditional GET - on 304 Not Modified serve the body cached from a previous run
+        with self._cache_lock:
+            cached = self.etag_cache.get(url)
+        headers = {'If-None-Match': cached[0]} if cached else None
+        response = self.session.get(url=url, headers=headers)
+
+        if response.status_code == 304 and cached:
+            return dict(cached[1])
+        _handle_http_error(response)
+        body = orjson.loads(response.content)
+        etag = response.headers.get('ETag')
+        if etag:
+            with self._cache_lock:
+                self.etag_cache[url] = [etag, dict(body)]
+        return body
+
+    def invalidate_triggers(self):
+        # drop the cached trigger list after a trigger is created or removed
+        with self._cache_lock:
+            self._triggers_cache = None
 
     def get_component_configuration_detail(self, component_id, configuration_id):
-        url = f'{self.url}/components/{component_id}/configs/{configuration_id}'
-        response = requests.get(url=url, headers=self.headers)
+        with self._cache_lock:
+            cached = self._cfg_cache.get((component_id, configuration_id))
+        if cached is not None:
+            return dict(cached)
 
-        self._handle_http_error(response)
-        return response.json()
+        url = f'{self.url}/components/{component_id}/configs/{configuration_id}'
+        configuration_detail = self._get_with_etag(url)
+        with self._cache_lock:
+            self._cfg_cache[(component_id, configuration_id)] = dict(configuration_detail)
+        return configuration_detail
 
     def get_table_detail(self, table_id):
-        url = f'{self.url}/tables/{table_id}'
-        response = requests.get(url=url, headers=self.headers)
+        with self._cache_lock:
+            cached = self._tbl_cache.get(table_id)
+        if cached is not None:
+            return dict(cached)
 
-        self._handle_http_error(response)
-        return response.json()
+        url = f'{self.url}/tables/{table_id}'
+        table_detail = self._get_with_etag(url)
+        with self._cache_lock:
+            self._tbl_cache[table_id] = dict(table_detail)
+        return table_detail
 
     def remove_trigger(self, trigger_id):
         url = f'{self.url}/triggers/{trigger_id}'
-        response = requests.delete(url=url, headers=self.headers)
+        response = self.session.delete(url=url)
 
-        self._handle_http_error(response)
+        _handle_http_error(response)
+        self.invalidate_triggers()
         logging.info(f"Trigger id:{trigger_id} deleted!")
         return response.text
 
     def create_trigger(self, trigger):
         url = f'{self.url}/triggers'
-        response = requests.post(url=url, headers=self.headers, json=trigger)
+        response = self.session.post(url=url, json=trigger)
 
-        self._handle_http_error(response)
-        logging.info(f"Trigger id:{response.json().get('id')} created!")
-        return response.json()
+        _handle_http_error(response)
+        self.invalidate_triggers()
+        created_trigger = orjson.loads(response.content)
+        logging.info(f"Trigger id:{created_trigger.get('id')} created!")
+        return created_trigger